@@ -1,8 +1,11 @@
 # treinos.py
+import importlib.util
 import io
 import os
-from datetime import time
+import uuid
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 
 # =========================
@@ -10,17 +13,31 @@ import streamlit as st
 # =========================
 st.set_page_config(page_title="Controle de Corridas", layout="wide")
 FILE_PATH = "Treinos Corrida.xlsx"
+# xlsxwriter (em modo constant_memory) escreve bem mais rápido que o openpyxl; usa-se quando instalado
+EXCEL_ENGINE = "xlsxwriter" if importlib.util.find_spec("xlsxwriter") else "openpyxl"
+# Leitura: calamine (nativo, em Rust) quando instalado; senão openpyxl
+EXCEL_READER = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
 
 # Cabeçalhos exatamente como na planilha
 COLS = ["Mês/Ano", "Data", "Semana", "Dia da Semana", "Distância (km)", "Tempo", "Pace (min/km)"]
 MESES_PT = ["janeiro","fevereiro","março","abril","maio","junho","julho","agosto","setembro","outubro","novembro","dezembro"]
+MESES_CAP = [m.capitalize() for m in MESES_PT]
 DIAS_PT   = ["Segunda","Terça","Quarta","Quinta","Sexta","Sábado","Domingo"]
+# mesmas tabelas como arrays, para rotular colunas inteiras com um take
+MESES_CAP_NP = np.array(MESES_CAP, dtype=object)
+DIAS_NP      = np.array(DIAS_PT, dtype=object)
+# Colunas auxiliares (não exibidas nem exportadas)
+COLS_AUX = ["_tempo_sec"]
+COLS_TEXTO = ["Tempo", "Pace (min/km)"]
+ZERO_TD = pd.Timedelta(0)
+# Listagem mostra só os treinos mais recentes, salvo pedido em contrário
+LISTAGEM_LINHAS = 200
 
 # =========================
 # Helpers
 # =========================
 def mes_ano_label(dt: pd.Timestamp) -> str:
-    m = MESES_PT[int(dt.month)-1].capitalize()
+    m = MESES_CAP[int(dt.month)-1]
     return f"{m} {int(dt.year)}"
 
 def dia_semana_nome(dt: pd.Timestamp) -> str:
@@ -30,24 +47,30 @@ def semana_iso_label(dt: pd.Timestamp) -> str:
     iso = dt.isocalendar()
     return f"{int(iso.year)}-W{int(iso.week):02d}"
 
-def to_timedelta(val) -> pd.Timedelta:
-    if pd.isna(val) or val == "":
-        return pd.to_timedelta(0, unit="s")
-    if isinstance(val, time):
-        return pd.to_timedelta(f"{val.hour}:{val.minute}:{val.second}")
-    try:
-        return pd.to_timedelta(val)
-    except Exception:
-        try:
-            return pd.to_timedelta(str(val))
-        except Exception:
-            return pd.to_timedelta(0, unit="s")
+def hms_to_timedelta(hh, mm, ss) -> pd.Timedelta:
+    # horas/minutos/segundos -> Timedelta, sem passar por texto
+    return pd.Timedelta(seconds=int(hh)*3600 + int(mm)*60 + int(ss))
+
+def to_timedelta_series(s: pd.Series) -> pd.Series:
+    # texto/time -> Timedelta, coluna inteira (vazios/inválidos -> 0)
+    return pd.to_timedelta(s.astype(str), errors="coerce").fillna(ZERO_TD)
 
 def timedelta_to_hms(td: pd.Timedelta) -> str:
     # hh:mm:ss (dias somados em horas)
     secs = int(td.total_seconds())
     return f"{secs//3600:02d}:{(secs%3600)//60:02d}:{secs%60:02d}"
 
+def _dois_digitos(n: pd.Series) -> pd.Series:
+    return n.astype(str).str.zfill(2)
+
+def segundos_to_hms_series(secs: pd.Series) -> pd.Series:
+    # segundos inteiros -> hh:mm:ss, em aritmética vetorizada
+    return _dois_digitos(secs//3600) + ":" + _dois_digitos((secs%3600)//60) + ":" + _dois_digitos(secs%60)
+
+def timedelta_to_hms_series(td: pd.Series) -> pd.Series:
+    # versão vetorizada de timedelta_to_hms
+    return segundos_to_hms_series(td.dt.total_seconds().fillna(0).astype("int64"))
+
 def pace_str(tempo_td: pd.Timedelta, dist) -> str:
     dist = float(dist or 0)
     if dist <= 0:
@@ -55,6 +78,59 @@ def pace_str(tempo_td: pd.Timedelta, dist) -> str:
     secs = int(tempo_td.total_seconds() / dist)
     return f"{secs//60:02d}:{secs%60:02d}"
 
+def pace_series(secs: pd.Series, dist: pd.Series) -> pd.Series:
+    # versão vetorizada de pace_str a partir dos segundos totais
+    d = dist.fillna(0).to_numpy(dtype="float64")
+    com_dist = d > 0
+    por_km = pd.Series(
+        (secs.to_numpy(dtype="float64") / np.where(com_dist, d, 1)).astype("int64"), index=secs.index
+    )
+    return (_dois_digitos(por_km//60) + ":" + _dois_digitos(por_km%60)).where(com_dist, "")
+
+def _como_categoria(s: pd.Series, categorias: list) -> pd.Series:
+    # coluna já category (pode ter categorias sem uso após apagar/editar):
+    # só reordena; senão constrói a partir dos valores simples
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.set_categories(categorias, ordered=True)
+    return pd.Series(
+        pd.Categorical(np.asarray(s, dtype=object), categories=categorias, ordered=True), index=s.index
+    )
+
+def categorizar(df: pd.DataFrame) -> pd.DataFrame:
+    # Rótulos repetidos como category, com as categorias em ordem cronológica.
+    # Recebe o df já ordenado por Data: a ordem de aparição é a cronológica.
+    dias = df["Dia da Semana"].dropna().unique().tolist()
+    df["Dia da Semana"] = _como_categoria(
+        df["Dia da Semana"], DIAS_PT + sorted(set(dias) - set(DIAS_PT))
+    )
+    for c in ("Mês/Ano", "Semana"):
+        ordem = df[c].dropna().unique().tolist()
+        df[c] = _como_categoria(df[c], ordem)
+    # texto livre num buffer Arrow contíguo em vez de objetos str
+    df[COLS_TEXTO] = df[COLS_TEXTO].astype("string[pyarrow]")
+    return df
+
+def acrescentar_categorias(df: pd.DataFrame, valores: dict) -> None:
+    # colunas category só aceitam valores já conhecidos
+    for c, v in valores.items():
+        if isinstance(df[c].dtype, pd.CategoricalDtype) and v not in df[c].cat.categories:
+            df[c] = df[c].cat.add_categories([v])
+
+def linha_treino(data, dist, tempo_td: pd.Timedelta) -> dict:
+    # registo já normalizado (com auxiliares) a partir dos campos do formulário
+    ts = pd.Timestamp(data)
+    return {
+        "Mês/Ano": mes_ano_label(ts),
+        "Data": ts,
+        "Semana": semana_iso_label(ts),
+        "Dia da Semana": dia_semana_nome(ts),
+        "Distância (km)": dist,
+        "Tempo": timedelta_to_hms(tempo_td),
+        "Pace (min/km)": pace_str(tempo_td, dist),
+        "_tempo_sec": int(tempo_td.total_seconds()),
+    }
+
+@st.cache_data(show_spinner=False, max_entries=8)
 def normalize_and_fill(df: pd.DataFrame) -> pd.DataFrame:
     # Garante todas as colunas
     for c in COLS:
@@ -65,76 +141,208 @@ def normalize_and_fill(df: pd.DataFrame) -> pd.DataFrame:
     if not pd.api.types.is_datetime64_any_dtype(df["Data"]):
         df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
 
-    # Distância
-    df["Distância (km)"] = pd.to_numeric(df["Distância (km)"], errors="coerce")
+    # Distância (sempre float64: km inteiros na folha não podem virar int64,
+    # senão Editar não consegue gravar 5.5 na coluna)
+    if df["Distância (km)"].dtype != "float64":
+        df["Distância (km)"] = pd.to_numeric(df["Distância (km)"], errors="coerce").astype("float64")
 
     # Tempo e Pace
-    tempo_td = df["Tempo"].apply(to_timedelta)
-    df["Tempo"] = tempo_td.apply(timedelta_to_hms)
-    pace_td = df["Pace (min/km)"].apply(to_timedelta)
-    df["Pace (min/km)"] = pace_td.apply(
-        lambda t: "" if t.total_seconds()==0 else f"{int((t.total_seconds()//60)%60):02d}:{int(t.total_seconds()%60):02d}"
-    )
+    tempo_td = to_timedelta_series(df["Tempo"])
+    df["Tempo"] = timedelta_to_hms_series(tempo_td)
+    df["_tempo_sec"] = tempo_td.dt.total_seconds().astype("int32")
+    pace_td = to_timedelta_series(df["Pace (min/km)"])
+    pace_total = pace_td.dt.total_seconds()
+    pace_secs = pace_total.astype("int64")
+    df["Pace (min/km)"] = (
+        _dois_digitos((pace_secs//60)%60) + ":" + _dois_digitos(pace_secs%60)
+    ).where(pace_total != 0, "")
 
     # Derivados da Data
+    # (folha só com cabeçalho ou sem datas: nada a derivar)
     mask = df["Data"].notna()
-    df.loc[mask, "Mês/Ano"]       = df.loc[mask, "Data"].apply(mes_ano_label)
-    df.loc[mask, "Dia da Semana"] = df.loc[mask, "Data"].apply(dia_semana_nome)
-    df.loc[mask, "Semana"]        = df.loc[mask, "Data"].apply(semana_iso_label)
-
-    return df[COLS].sort_values("Data").reset_index(drop=True)
+    if mask.any():
+        # rótulos vazios na folha chegam como float (tudo NaN): abre para texto
+        for c in ("Mês/Ano", "Dia da Semana", "Semana"):
+            if not pd.api.types.is_string_dtype(df[c]):
+                df[c] = df[c].astype(object)
+        datas = df.loc[mask, "Data"]
+        df.loc[mask, "Mês/Ano"]       = MESES_CAP_NP.take(datas.dt.month.to_numpy() - 1) + " " + datas.dt.year.astype(str)
+        df.loc[mask, "Dia da Semana"] = DIAS_NP.take(datas.dt.weekday.to_numpy())
+        iso = datas.dt.isocalendar()
+        df.loc[mask, "Semana"]        = iso["year"].astype(str) + "-W" + _dois_digitos(iso["week"])
+
+    df = df[COLS + COLS_AUX]
+    # planilhas em geral já vêm por data; só ordena se preciso
+    if not df["Data"].is_monotonic_increasing:
+        df = df.sort_values("Data")
+    df = categorizar(df.reset_index(drop=True))
+    # marca que viaja no Parquet: derivados já calculados, não recalcular
+    df.attrs["normalizado"] = True
+    return df
 
 def load_planilha(f) -> pd.DataFrame:
-    df = pd.read_excel(f, sheet_name="treinos")
+    if str(getattr(f, "name", f)).endswith(".parquet"):
+        df = pd.read_parquet(f)
+        # parquet exportado pela app já vem normalizado e tipado; copia
+        # porque o pyarrow entrega algumas colunas só de leitura (Editar
+        # grava nelas no lugar)
+        if df.attrs.get("normalizado"):
+            return df[COLS + COLS_AUX].copy()
+    else:
+        # só as colunas da app; outras colunas da folha nem são convertidas
+        df = pd.read_excel(f, sheet_name="treinos", engine=EXCEL_READER, usecols=lambda c: c in COLS)
     return normalize_and_fill(df)
 
-def save_excel_bytes(df):
+def save_parquet_bytes(df):
     out = io.BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="treinos", index=False)
-
-        aux = df.copy()
-        aux["tempo_td"] = aux["Tempo"].apply(to_timedelta)
-
-        # Resumo por Mês/Ano (ordenação cronológica)
-        rm = (
-            aux.groupby("Mês/Ano", as_index=False)
-               .agg(treinos=("Data","count"),
-                    distancia_km=("Distância (km)","sum"),
-                    tempo=("tempo_td","sum"))
-        )
-        if not rm.empty:
-            rm["ordem"] = pd.to_datetime(
-                # ano + mês (número)
-                rm["Mês/Ano"].str.split().str[1] + "-" +
-                rm["Mês/Ano"].str.split().str[0].str.lower().map(lambda m: str(MESES_PT.index(m)+1).zfill(2)),
-                errors="coerce"
-            )
-            rm = rm.sort_values("ordem").drop(columns=["ordem"])
-            rm["ritmo_medio"] = rm.apply(lambda r: pace_str(r["tempo"], r["distancia_km"]), axis=1)
-            rm["tempo"] = rm["tempo"].apply(timedelta_to_hms)
-        rm.to_excel(writer, sheet_name="resumo_mes", index=False)
-
-        # Resumo por Semana
-        rs = (
-            aux.groupby("Semana", as_index=False)
-               .agg(treinos=("Data","count"),
-                    distancia_km=("Distância (km)","sum"),
-                    tempo=("tempo_td","sum"))
-               .sort_values("Semana")
-        )
-        if not rs.empty:
-            rs["ritmo_medio"] = rs.apply(lambda r: pace_str(r["tempo"], r["distancia_km"]), axis=1)
-            rs["tempo"] = rs["tempo"].apply(timedelta_to_hms)
-        rs.to_excel(writer, sheet_name="resumo_semana", index=False)
+    df.to_parquet(out, engine="pyarrow", compression="zstd", index=False)
+    return out.getvalue()
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def carregar_planilha(path: str, mtime: float) -> pd.DataFrame:
+    # mtime só entra na chave: ficheiro alterado no disco -> nova leitura.
+    # Guarda ao lado uma cópia normalizada em Parquet, marcada com o mtime
+    # e o tamanho do xlsx de origem; só é usada se ambos baterem certo
+    # (um xlsx reposto com data antiga também invalida a cópia).
+    pq = os.path.splitext(path)[0] + ".parquet"
+    origem = {"mtime": mtime, "tamanho": os.path.getsize(path)}
+    if os.path.exists(pq):
+        try:
+            df = load_planilha(pq)
+            if df.attrs.get("origem") == origem:
+                return df
+        except Exception:
+            pass  # cópia corrompida ou incompleta: é só cache, relê o xlsx
+    df = load_planilha(path)
+    df.attrs["origem"] = origem
+    # escreve num temporário na mesma pasta e troca de uma vez, para nunca
+    # deixar uma cópia a meio (queda, disco cheio, duas sessões a gravar)
+    tmp = f"{pq}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(save_parquet_bytes(df))
+        os.replace(tmp, pq)
+    except OSError:
+        # pasta só de leitura ou sem espaço: segue sem a cópia
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def carregar_upload(nome: str, conteudo: bytes) -> pd.DataFrame:
+    f = io.BytesIO(conteudo)
+    f.name = nome
+    return load_planilha(f)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def resumo_por(versao: str, _df: pd.DataFrame, chave: str) -> pd.DataFrame:
+    # Resumo por "Mês/Ano" ou "Semana", em ordem cronológica; calculado uma
+    # vez por versão dos dados e partilhado entre Resumos e o Excel
+    # a chave é category com as categorias já em ordem cronológica
+    # (categorizar), por isso a ordem dos grupos sai direto do groupby
+    g = (
+        _df.groupby(chave, as_index=False, observed=True, sort=True)
+           .agg(Treinos=("Data","count"),
+                **{"Distância (km)": ("Distância (km)","sum")},
+                Tempo=("_tempo_sec","sum"))
+    )
+    if g.empty:
+        return g
+    g["Ritmo médio"] = pace_series(g["Tempo"], g["Distância (km)"])
+    g["Tempo"] = segundos_to_hms_series(g["Tempo"])
+    return g
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def resumo_total(versao: str, _df: pd.DataFrame) -> tuple:
+    # métricas do "Total geral", também uma vez por versão dos dados
+    total_km = float(_df["Distância (km)"].sum())
+    total_t  = pd.to_timedelta(int(_df["_tempo_sec"].sum()), unit="s")
+    ritmo = pace_str(total_t, total_km) if total_km>0 else "00:00"
+    return total_km, timedelta_to_hms(total_t), ritmo
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def tabela_arrow(versao: str, _df: pd.DataFrame, crescente: bool = True, ultimas: int = 0) -> pa.Table:
+    # projeção e conversão para Arrow feitas uma vez por versão dos dados
+    # (chave é a versão; _df não é copiado nem hasheado a cada rerun).
+    # A tabela da sessão está sempre por data: decrescente é só inverter.
+    vista = _df[COLS].iloc[-ultimas:] if ultimas else _df[COLS]
+    if not crescente:
+        vista = vista.iloc[::-1]
+    return pa.Table.from_pandas(vista, preserve_index=True)
+
+def marcar_alteracao():
+    # nova versão dos dados da sessão (invalida os exports em cache)
+    st.session_state.versao = uuid.uuid4().hex
+
+# Cabeçalhos das folhas de resumo no Excel
+RESUMO_XLSX = {"Treinos": "treinos", "Distância (km)": "distancia_km", "Tempo": "tempo", "Ritmo médio": "ritmo_medio"}
+
+def linhas_excel(df: pd.DataFrame):
+    # valores nativos do Python, linha a linha (NaN/NaT -> célula vazia)
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def escrever_xlsx(folhas: dict) -> bytes:
+    out = io.BytesIO()
+    if EXCEL_ENGINE != "xlsxwriter":
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+        # write_only grava as linhas em fluxo, sem montar a folha em memória
+        wb = Workbook(write_only=True)
+        fino = Side(style="thin")
+        for nome, df in folhas.items():
+            ws = wb.create_sheet(nome)
+            cab = []
+            for c in df.columns:
+                cel = WriteOnlyCell(ws, value=c)
+                cel.font = Font(bold=True)
+                cel.border = Border(left=fino, right=fino, top=fino, bottom=fino)
+                cel.alignment = Alignment(horizontal="center", vertical="top")
+                cab.append(cel)
+            ws.append(cab)
+            for linha in linhas_excel(df):
+                ws.append(linha)
+        wb.save(out)
+        return out.getvalue()
+
+    import xlsxwriter
+    # constant_memory grava cada linha assim que é escrita; por isso as
+    # folhas são escritas aqui linha a linha (o to_excel do pandas escreve
+    # por coluna e perderia células neste modo)
+    wb = xlsxwriter.Workbook(out, {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+    cabecalho = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for nome, df in folhas.items():
+        ws = wb.add_worksheet(nome)
+        ws.write_row(0, 0, list(df.columns), cabecalho)
+        for i, linha in enumerate(linhas_excel(df), start=1):
+            ws.write_row(i, 0, linha)
+    wb.close()
     return out.getvalue()
 
+def save_excel_bytes(df, versao: str):
+    return escrever_xlsx({
+        "treinos": df[COLS],
+        "resumo_mes": resumo_por(versao, df, "Mês/Ano").rename(columns=RESUMO_XLSX),
+        "resumo_semana": resumo_por(versao, df, "Semana").rename(columns=RESUMO_XLSX),
+    })
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def excel_em_cache(versao: str, _df: pd.DataFrame) -> bytes:
+    # chave é só a versão; _df não é hasheado pelo Streamlit
+    return save_excel_bytes(_df, versao)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parquet_em_cache(versao: str, _df: pd.DataFrame) -> bytes:
+    return save_parquet_bytes(_df)
+
 # =========================
 # Estado
 # =========================
 if "df" not in st.session_state:
     st.session_state.df = pd.DataFrame(columns=COLS)
+    marcar_alteracao()
 
 # =========================
 # Sidebar (Menu)
@@ -153,17 +361,26 @@ menu = st.sidebar.radio(
 
 st.sidebar.markdown("---")
 st.sidebar.header("📂 Planilha oficial")
+# Só (re)carrega quando a origem muda; nos demais reruns mantém o df da sessão
 if os.path.exists(FILE_PATH):
     try:
-        st.session_state.df = load_planilha(FILE_PATH)
+        fonte = (FILE_PATH, os.path.getmtime(FILE_PATH))
+        if st.session_state.get("fonte") != fonte:
+            st.session_state.df = carregar_planilha(*fonte)
+            st.session_state.fonte = fonte
+            marcar_alteracao()
         st.sidebar.success("Carregada automaticamente")
     except Exception as e:
         st.sidebar.error(str(e))
 else:
-    up = st.sidebar.file_uploader("Carregar Treinos Corrida.xlsx", type=["xlsx"])
+    up = st.sidebar.file_uploader("Carregar Treinos Corrida (.xlsx ou .parquet)", type=["xlsx", "parquet"])
     if up:
         try:
-            st.session_state.df = load_planilha(up)
+            fonte = (up.name, up.file_id)
+            if st.session_state.get("fonte") != fonte:
+                st.session_state.df = carregar_upload(up.name, up.getvalue())
+                st.session_state.fonte = fonte
+                marcar_alteracao()
             st.sidebar.success("Planilha carregada via upload.")
         except Exception as e:
             st.sidebar.error(str(e))
@@ -171,11 +388,18 @@ else:
 if not st.session_state.df.empty:
     st.sidebar.download_button(
         "⬇️ Baixar Excel atualizado",
-        data=save_excel_bytes(st.session_state.df),
+        data=excel_em_cache(st.session_state.versao, st.session_state.df),
         file_name="Treinos Corrida - atualizado.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True,
     )
+    st.sidebar.download_button(
+        "⬇️ Baixar Parquet",
+        data=parquet_em_cache(st.session_state.versao, st.session_state.df),
+        file_name="Treinos Corrida.parquet",
+        mime="application/vnd.apache.parquet",
+        use_container_width=True,
+    )
 
 df = st.session_state.df
 
@@ -194,18 +418,22 @@ if menu.startswith("➕"):
         ss = t3.number_input("Segundos",min_value=0, max_value=59, step=1, value=0)
         ok = st.form_submit_button("➕ Adicionar")
         if ok:
-            tempo_td = pd.to_timedelta(f"{int(hh):02d}:{int(mm):02d}:{int(ss):02d}")
-            new = {
-                "Mês/Ano": mes_ano_label(pd.to_datetime(data)),
-                "Data": pd.to_datetime(data),
-                "Semana": semana_iso_label(pd.to_datetime(data)),
-                "Dia da Semana": dia_semana_nome(pd.to_datetime(data)),
-                "Distância (km)": dist,
-                "Tempo": timedelta_to_hms(tempo_td),
-                "Pace (min/km)": pace_str(tempo_td, dist),
-            }
-            st.session_state.df = pd.concat([st.session_state.df, pd.DataFrame([new])], ignore_index=True)
-            st.session_state.df = normalize_and_fill(st.session_state.df)
+            new = linha_treino(data, dist, hms_to_timedelta(hh, mm, ss))
+            # a linha nova já traz todos os derivados; nada a renormalizar
+            # e a tabela já está por data: basta inserir na posição certa
+            novo = st.session_state.df
+            pos = int(novo["Data"].searchsorted(new["Data"], side="right"))
+            if novo.empty:
+                novo = pd.DataFrame([new])
+                novo.attrs["normalizado"] = True  # linha_treino já traz os derivados
+            elif pos == len(novo):
+                novo.loc[len(novo)] = new  # caso comum: treino mais recente
+            else:
+                novo = pd.concat([novo.iloc[:pos], pd.DataFrame([new]), novo.iloc[pos:]], ignore_index=True)
+                novo.attrs["normalizado"] = True
+            novo["_tempo_sec"] = novo["_tempo_sec"].astype("int32")
+            st.session_state.df = categorizar(novo)
+            marcar_alteracao()
             st.success("Treino adicionado! ✅")
 
 elif menu.startswith("✏️"):
@@ -213,16 +441,14 @@ elif menu.startswith("✏️"):
     if df.empty:
         st.info("Carregue a planilha na barra lateral.")
     else:
-        dfv = df.copy()
-        dfv["idx"] = dfv.index
-        dfv["rotulo"] = dfv["Data"].dt.strftime("%Y-%m-%d") + " | " + dfv["Distância (km)"].fillna(0).map(lambda x: f"{x:.2f} km")
-
-        # opções com vazio no início
-        opcoes = [""] + dfv["idx"].tolist()
+        km = np.char.mod("%.2f km", df["Distância (km)"].fillna(0).to_numpy())
+        rotulos = df["Data"].dt.strftime("%Y-%m-%d") + " | " + km
+        # rótulo por índice num dict simples (com vazio no início)
+        labels = {"": "", **dict(zip(df.index.tolist(), rotulos.tolist()))}
         idx = st.selectbox(
             "Selecione um treino",
-            options=opcoes,
-            format_func=lambda i: dfv.loc[i, "rotulo"] if i != "" else ""
+            options=list(labels),
+            format_func=labels.get
         )
 
         if idx != "":
@@ -233,28 +459,29 @@ elif menu.startswith("✏️"):
             dist = c2.number_input("Distância (km)", min_value=0.0, step=0.01, value=float(row["Distância (km)"] or 0))
 
             t1,t2,t3 = st.columns(3)
-            td = to_timedelta(row["Tempo"])
-            hh0 = int(td.total_seconds()//3600)
-            mm0 = int((td.total_seconds()%3600)//60)
-            ss0 = int(td.total_seconds()%60)
+            # segundos já guardados na coluna auxiliar: nada a reinterpretar
+            secs0 = int(row["_tempo_sec"])
+            hh0, mm0, ss0 = secs0//3600, (secs0%3600)//60, secs0%60
             hh = t1.number_input("Horas",   min_value=0, max_value=23, step=1, value=hh0)
             mm = t2.number_input("Minutos", min_value=0, max_value=59, step=1, value=mm0)
             ss = t3.number_input("Segundos",min_value=0, max_value=59, step=1, value=ss0)
 
             col1,col2 = st.columns(2)
             if col1.button("💾 Guardar alterações", use_container_width=True):
-                tempo = pd.to_timedelta(f"{int(hh):02d}:{int(mm):02d}:{int(ss):02d}")
-                st.session_state.df.at[idx,"Data"]            = pd.to_datetime(data)
-                st.session_state.df.at[idx,"Mês/Ano"]         = mes_ano_label(pd.to_datetime(data))
-                st.session_state.df.at[idx,"Semana"]          = semana_iso_label(pd.to_datetime(data))
-                st.session_state.df.at[idx,"Dia da Semana"]   = dia_semana_nome(pd.to_datetime(data))
-                st.session_state.df.at[idx,"Distância (km)"]  = dist
-                st.session_state.df.at[idx,"Tempo"]           = timedelta_to_hms(tempo)
-                st.session_state.df.at[idx,"Pace (min/km)"]   = pace_str(tempo, dist)
+                valores = linha_treino(data, dist, hms_to_timedelta(hh, mm, ss))
+                acrescentar_categorias(st.session_state.df, valores)
+                cols = list(valores)
+                st.session_state.df.loc[idx, cols] = [valores[c] for c in cols]
+                # mantém a tabela ordenada por data (a data pode ter mudado)
+                if not st.session_state.df["Data"].is_monotonic_increasing:
+                    st.session_state.df.sort_values("Data", inplace=True, ignore_index=True)
+                categorizar(st.session_state.df)
+                marcar_alteracao()
                 st.success("Registo atualizado. ✅")
 
             if col2.button("🗑️ Apagar treino", use_container_width=True):
                 st.session_state.df = df.drop(index=idx).reset_index(drop=True)
+                marcar_alteracao()
                 st.success("Registo apagado. 🗑️")
 
 elif menu.startswith("📋"):
@@ -262,7 +489,10 @@ elif menu.startswith("📋"):
     if df.empty:
         st.info("Carregue a planilha.")
     else:
-        st.dataframe(df.sort_values("Data", ascending=False), use_container_width=True)
+        # só as últimas linhas vão para o browser, a menos que se peça tudo
+        tudo = len(df) > LISTAGEM_LINHAS and st.checkbox(f"Mostrar tudo ({len(df)} treinos)")
+        ultimas = 0 if tudo else LISTAGEM_LINHAS
+        st.dataframe(tabela_arrow(st.session_state.versao, df, crescente=False, ultimas=ultimas), use_container_width=True)
 
 else:  # 📊 Resumos
     st.header("📊 Resumos")
@@ -280,51 +510,24 @@ else:  # 📊 Resumos
     elif tipo == "":
         st.info("Selecione um tipo de resumo acima ⬆️")
     else:
-        aux = df.copy()
-        aux["tempo_td"] = aux["Tempo"].apply(to_timedelta)
-
         if tipo == "Mês/ano":
-            g = (
-                aux.groupby("Mês/Ano", as_index=False)
-                   .agg(Treinos=("Data","count"),
-                        **{"Distância (km)": ("Distância (km)","sum")},
-                        Tempo=("tempo_td","sum"))
-            )
+            g = resumo_por(st.session_state.versao, df, "Mês/Ano")
             if not g.empty:
-                # ordenação cronológica por ano-mês
-                g["ordem"] = pd.to_datetime(
-                    g["Mês/Ano"].str.split().str[1] + "-" +
-                    g["Mês/Ano"].str.split().str[0].str.lower().map(lambda m: str(MESES_PT.index(m)+1).zfill(2)),
-                    errors="coerce"
-                )
-                g = g.sort_values("ordem").drop(columns=["ordem"])
-                g["Ritmo médio"] = g.apply(lambda r: pace_str(r["Tempo"], r["Distância (km)"]), axis=1)
-                g["Tempo"] = g["Tempo"].apply(timedelta_to_hms)
                 st.dataframe(g, use_container_width=True)
             else:
                 st.info("Sem dados para agrupar por mês/ano.")
 
         elif tipo == "Semana":
-            g = (
-                aux.groupby("Semana", as_index=False)
-                   .agg(Treinos=("Data","count"),
-                        **{"Distância (km)": ("Distância (km)","sum")},
-                        Tempo=("tempo_td","sum"))
-                   .sort_values("Semana")
-            )
+            g = resumo_por(st.session_state.versao, df, "Semana")
             if not g.empty:
-                g["Ritmo médio"] = g.apply(lambda r: pace_str(r["Tempo"], r["Distância (km)"]), axis=1)
-                g["Tempo"] = g["Tempo"].apply(timedelta_to_hms)
                 st.dataframe(g, use_container_width=True)
             else:
                 st.info("Sem dados para agrupar por semana.")
 
         else:  # Total geral
-            total_km = aux["Distância (km)"].sum()
-            total_t  = aux["tempo_td"].sum()
+            total_km, tempo_total, ritmo = resumo_total(st.session_state.versao, df)
             c1,c2,c3 = st.columns(3)
             c1.metric("Total (km)", f"{total_km:.2f}")
-            c2.metric("Tempo total", timedelta_to_hms(total_t))  # hh:mm:ss
-            ritmo = pace_str(total_t, total_km) if total_km>0 else "00:00"
+            c2.metric("Tempo total", tempo_total)  # hh:mm:ss
             c3.metric("Ritmo médio", ritmo)
-            st.dataframe(df.sort_values("Data"), use_container_width=True)
+            st.dataframe(tabela_arrow(st.session_state.versao, df), use_container_width=True)